@@ -3,105 +3,364 @@
 
 
 import argparse
+import asyncio
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import csv
+from dataclasses import dataclass
 from datetime import datetime
-import json
+import functools
+import importlib.util
 import logging
+from operator import attrgetter
+import orjson
 import os
 from pathlib import Path
 import shutil
+import stat
 import sys
 from tabulate import tabulate
 import textwrap
+import threading
 
 
 VALID_REGIONS = {"us-east-1", "us-east-2", "us-west-1", "us-west-2",
                  "ca-central-1", "eu-west-1", "eu-west-2", "eu-central-1"}
 
+BOTOCORE_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 10}
+)
+
+# Every instance state except terminated
+LIVE_STATES = ["pending", "running", "shutting-down", "stopping", "stopped"]
+
+CSV_HEADERS = ["InstanceID", "Name", "Account", "Type", "State", "AZ", "PrivateIP", "PublicIP", "VPC", "Subnet", "ENIs", "Volumes"]
+
+
+_session_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _session_for(profile):
+    """Build one boto3 Session per profile, shared by the scan threads"""
+    with _session_lock:
+        return boto3.Session(profile_name=profile)
+
+
+def _client_for(profile, service, region=None):
+    """Create a client from the shared session - Session.client() is not thread-safe"""
+    session = _session_for(profile)
+    with _session_lock:
+        return session.client(service, region_name=region, config=BOTOCORE_CONFIG)
+
+
+@functools.lru_cache(maxsize=None)
+def _account_for(profile):
+    """Look up the account number for a profile once"""
+    return _client_for(profile, 'sts').get_caller_identity().get('Account')
+
+
+def describe_instance_pages(ec2_client, **kwargs):
+    """Yield describe_instances pages by following NextToken by hand"""
+    response = ec2_client.describe_instances(MaxResults=1000, **kwargs)
+    while True:
+        yield response
+        if 'NextToken' not in response:
+            break
+        response = ec2_client.describe_instances(MaxResults=1000, NextToken=response['NextToken'], **kwargs)
+
+
+@dataclass(slots=True)
+class InstanceRecord:
+    """The fields we report for one instance"""
+    instance_id: str
+    instance_name: str
+    account: str
+    region: str
+    type: str
+    state: str
+    az: str
+    privateipv4: str
+    publicipv4: str
+    vpc: str
+    subnet: str
+    enis: list      # (eni_id, private_ip, ipv6_addresses, vpc_id, subnet_id) tuples
+    volumes: list
+
+    def key(self):
+        """The instance_account_region key used in JSON output"""
+        return f"{self.instance_id}_{self.account}_{self.region}"
+
+    def enis_dict(self):
+        """Expand the ENI tuples back into the nested dicts used in output"""
+        return {
+            eni_id: {'PrivateIpAddress': ip, 'Ipv6Addresses': ipv6, 'VpcId': vpc, 'SubnetId': subnet}
+            for eni_id, ip, ipv6, vpc, subnet in self.enis
+        }
+
+    def to_dict(self):
+        """The JSON shape of the record"""
+        return {
+            'instance_id': self.instance_id,
+            'instance_name': self.instance_name,
+            'account': self.account,
+            'type': self.type,
+            'state': self.state,
+            'az': self.az,
+            'privateipv4': self.privateipv4,
+            'publicipv4': self.publicipv4,
+            'vpc': self.vpc,
+            'subnet': self.subnet,
+            'enis': self.enis_dict(),
+            'volumes': self.volumes
+        }
+
+
+def instance_record(inst, acct_num, region):
+    """Pick the fields we report out of a describe_instances entry"""
+    instance_name = next((t['Value'] for t in inst.get('Tags', []) if t['Key'] == 'Name'), 'N/A')
+
+    enis = [
+        (eni['NetworkInterfaceId'], eni['PrivateIpAddress'], eni['Ipv6Addresses'], eni['VpcId'], eni['SubnetId'])
+        for eni in inst['NetworkInterfaces']
+    ]
+
+    volumes = []
+    if 'BlockDeviceMappings' in inst:
+        for device in inst['BlockDeviceMappings']:
+            volume_info = {
+                'DeviceName': device.get('DeviceName'),
+                'VolumeId': device.get('Ebs', {}).get('VolumeId'),
+                'Status': device.get('Ebs', {}).get('Status'),
+                'AttachTime': str(device.get('Ebs', {}).get('AttachTime')),
+                'DeleteOnTermination': device.get('Ebs', {}).get('DeleteOnTermination')
+            }
+            volumes.append(volume_info)
+
+    return InstanceRecord(
+        instance_id=inst['InstanceId'],
+        instance_name=instance_name,
+        account=acct_num,
+        region=region,
+        type=inst['InstanceType'],
+        state=inst['State']['Name'],
+        az=inst.get('Placement', {}).get('AvailabilityZone', 'N/A'),
+        privateipv4=inst.get('PrivateIpAddress', 'N/A'),
+        publicipv4=inst.get('PublicIpAddress'),
+        vpc=inst.get('VpcId', 'N/A'),
+        subnet=inst.get('SubnetId', 'N/A'),
+        enis=enis,
+        volumes=volumes
+    )
 
-def main(profiles, outfile, outputformat, dry_run, tformat, regions):
-    """List instances in profiles"""
-    instances_found = {}
 
-    logging.info(f"Checking regions {regions}")
+def scan(profile, region, acct_num, emit, filters):
+    """List instances for a single profile and region, handing each page to emit"""
+    count = 0
 
-    if not profiles:
-        profiles = boto3.session.Session().available_profiles
+    logging.info(f"Processing profile {profile} in {region}")
+    try:
+        _session_for(profile)
+    except Exception as e:
+        logging.error(f"Failed to create session for profile {profile}: {e}")
+        return count
+
+    try:
+        ec2_client = _client_for(profile, 'ec2', region)
+    except Exception as e:
+        logging.error(f"Cannot query EC2 instances in {region}: {e}")
+        return count
 
+    try:
+        for page in describe_instance_pages(ec2_client, Filters=filters):
+            found = [
+                instance_record(inst, acct_num, region)
+                for reservation in page["Reservations"]
+                for inst in reservation['Instances']
+            ]
+
+            emit(found)
+            count += len(found)
+    except Exception as e:
+        logging.error(f"Failed to describe instances in {region} for profile {profile}: {e}")
+
+    return count
+
+
+def csv_row(instance):
+    """Flatten an instance record into a CSV row"""
+    return [
+        instance.instance_id,
+        instance.instance_name,
+        instance.account,
+        instance.type,
+        instance.state,
+        instance.az,
+        instance.privateipv4,
+        instance.publicipv4,
+        instance.vpc,
+        instance.subnet,
+        orjson.dumps(instance.enis_dict(), default=str).decode(),
+        orjson.dumps(instance.volumes, default=str).decode()
+    ]
+
+
+def json_keyed(instances_found):
+    """Key the records by instance_account_region for JSON output"""
+    return {instance.key(): instance.to_dict() for instance in instances_found}
+
+
+def write_rows(writer, lock, found):
+    """Write a page of instances to a CSV writer shared between scan threads"""
+    rows = [csv_row(instance) for instance in found]
+    with lock:
+        writer.writerows(rows)
+
+
+def scan_tasks(profiles, regions, accounts):
+    """(profile, region, account) per account/region - profiles sharing an account are scanned once"""
+    tasks = {}
     for profile in profiles:
-        logging.info(f"Processing profile {profile}")
-        try:
-            session = boto3.Session(profile_name=profile)
-        except Exception as e:
-            logging.error(f"Failed to create session for profile {profile}: {e}")
+        if profile not in accounts:
             continue
-        sts_client = session.client('sts')
-
         for region in regions:
-            try:
-                ec2_client = session.client('ec2', region_name=region)
-            except Exception as e:
-                logging.error(f"Cannot query EC2 instances in {region}: {e}")
-                continue
+            tasks.setdefault((accounts[profile], region), (profile, region, accounts[profile]))
+    return list(tasks.values())
+
+
+def run_scans(profiles, regions, emit, filters):
+    """Scan every profile/region pair concurrently - returns the number of instances found"""
+    count = 0
+
+    if not profiles:
+        return count
 
+    with ThreadPoolExecutor(max_workers=min(32, max(1, len(profiles) * len(regions)))) as executor:
+        accounts = {}
+        lookups = {executor.submit(_account_for, p): p for p in profiles}
+        for future in as_completed(lookups):
+            profile = lookups[future]
             try:
-                acct_num = sts_client.get_caller_identity().get('Account')
+                accounts[profile] = future.result()
             except Exception as e:
                 logging.error(f"Failed to get account ID for profile {profile}: {e}")
-                continue
 
+        tasks = scan_tasks(profiles, regions, accounts)
+        futures = [executor.submit(scan, p, r, a, emit, filters) for p, r, a in tasks]
+        for future in as_completed(futures):
             try:
-                paginator = ec2_client.get_paginator("describe_instances")
+                count += future.result()
             except Exception as e:
                 logging.exception(e)
-            else:
-                for page in paginator.paginate():
-                    for reservation in page["Reservations"]:
-                        for inst in reservation['Instances']:
-                            instance_name = 'N/A'
-                            if 'Tags' in inst:
-                                for tag in inst['Tags']:
-                                    if tag['Key'] == 'Name':
-                                        instance_name = tag['Value']
-                                        break
-
-                            enis = {}
-                            for eni in inst['NetworkInterfaces']:
-                                enis[eni['NetworkInterfaceId']] = {
-                                    'PrivateIpAddress': eni['PrivateIpAddress'],
-                                    'Ipv6Addresses': eni['Ipv6Addresses'],
-                                    'VpcId': eni['VpcId'],
-                                    'SubnetId': eni['SubnetId']
-                                }
-
-                            volumes = []
-                            if 'BlockDeviceMappings' in inst:
-                                for device in inst['BlockDeviceMappings']:
-                                    volume_info = {
-                                        'DeviceName': device.get('DeviceName'),
-                                        'VolumeId': device.get('Ebs', {}).get('VolumeId'),
-                                        'Status': device.get('Ebs', {}).get('Status'),
-                                        'AttachTime': str(device.get('Ebs', {}).get('AttachTime')),
-                                        'DeleteOnTermination': device.get('Ebs', {}).get('DeleteOnTermination')
-                                    }
-                                    volumes.append(volume_info)
-
-                            key = f"{inst['InstanceId']}_{acct_num}_{region}"
-                            instances_found[key] = {
-                                'instance_id': inst['InstanceId'],
-                                'instance_name': instance_name,
-                                'account': acct_num,
-                                'type': inst['InstanceType'],
-                                'state': inst['State']['Name'],
-                                'az': inst.get('Placement', {}).get('AvailabilityZone', 'N/A'),
-                                'privateipv4': inst.get('PrivateIpAddress', 'N/A'),
-                                'publicipv4': inst.get('PublicIpAddress'),
-                                'vpc': inst.get('VpcId', 'N/A'),
-                                'subnet': inst.get('SubnetId', 'N/A'),
-                                'enis': enis,
-                                'volumes': volumes
-                            }
+
+    return count
+
+
+async def describe_instance_pages_async(ec2_client, **kwargs):
+    """Async twin of describe_instance_pages() for aiobotocore clients"""
+    response = await ec2_client.describe_instances(MaxResults=1000, **kwargs)
+    while True:
+        yield response
+        if 'NextToken' not in response:
+            break
+        response = await ec2_client.describe_instances(MaxResults=1000, NextToken=response['NextToken'], **kwargs)
+
+
+async def _account_for_async(session, config):
+    """Look up the account number for an aiobotocore session"""
+    async with session.create_client('sts', config=config) as sts_client:
+        return (await sts_client.get_caller_identity()).get('Account')
+
+
+async def scan_async(session, config, profile, region, acct_num, emit, filters):
+    """Async twin of scan() for the aiobotocore driver"""
+    count = 0
+
+    logging.info(f"Processing profile {profile} in {region}")
+    try:
+        async with session.create_client('ec2', region_name=region, config=config) as ec2_client:
+            async for page in describe_instance_pages_async(ec2_client, Filters=filters):
+                found = [
+                    instance_record(inst, acct_num, region)
+                    for reservation in page["Reservations"]
+                    for inst in reservation['Instances']
+                ]
+
+                emit(found)
+                count += len(found)
+    except Exception as e:
+        logging.error(f"Failed to describe instances in {region} for profile {profile}: {e}")
+
+    return count
+
+
+async def run_scans_async(profiles, regions, emit, filters):
+    """Scan every profile/region pair on one event loop - returns the number of instances found"""
+    # aiobotocore is optional and only needed for --async
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import AioSession
+
+    config = AioConfig(max_pool_connections=100, retries={"mode": "adaptive", "max_attempts": 10})
+    sessions = {p: AioSession(profile=p) for p in profiles}
+
+    accounts = {}
+    results = await asyncio.gather(*(_account_for_async(sessions[p], config) for p in profiles), return_exceptions=True)
+    for profile, result in zip(profiles, results):
+        if isinstance(result, Exception):
+            logging.error(f"Failed to get account ID for profile {profile}: {result}")
+        else:
+            accounts[profile] = result
+
+    counts = await asyncio.gather(*(
+        scan_async(sessions[p], config, p, r, a, emit, filters)
+        for p, r, a in scan_tasks(profiles, regions, accounts)
+    ))
+
+    return sum(counts)
+
+
+def scan_profiles(profiles, regions, emit, filters, use_async):
+    """Run the scans with the thread pool or, for --async, the aiobotocore event loop"""
+    if use_async:
+        return asyncio.run(run_scans_async(profiles, regions, emit, filters))
+    return run_scans(profiles, regions, emit, filters)
+
+
+def main(profiles, outfile, outputformat, dry_run, tformat, regions, include_terminated=False, use_async=False):
+    """List instances in profiles"""
+    logging.info(f"Checking regions {regions}")
+
+    filters = [] if include_terminated else [{'Name': 'instance-state-name', 'Values': LIVE_STATES}]
+
+    if not profiles:
+        profiles = boto3.session.Session().available_profiles
+
+    if outputformat == "CSV" and not dry_run:
+        # Stream rows to the file as pages arrive - CSV output is not sorted
+        try:
+            with Path(outfile).open('w', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(CSV_HEADERS)
+                count = scan_profiles(profiles, regions, functools.partial(write_rows, writer, threading.Lock()), filters, use_async)
+        except Exception:
+            logging.error(f"Failed to write {outfile}")
+            return
+
+        if not count:
+            Path(outfile).unlink()
+            logging.warning("No instances found across selected profiles.")
+        else:
+            logging.info(f"Wrote {count} instances to {outfile}")
+        return
+
+    instances_found = []
+    scan_profiles(profiles, regions, instances_found.extend, filters, use_async)
+    # scan_tasks() scans each account/region once, so there are no duplicates - sort once so
+    # JSON and table output don't follow the order the scan threads finished in
+    instances_found.sort(key=attrgetter("account", "az", "instance_id"))
 
     if not instances_found:
         logging.warning("No instances found across selected profiles.")
@@ -110,7 +369,7 @@ def main(profiles, outfile, outputformat, dry_run, tformat, regions):
     if dry_run:
         if outputformat == "JSON":
             print()
-            print(json.dumps(instances_found, indent=4))
+            print(orjson.dumps(json_keyed(instances_found), default=str, option=orjson.OPT_INDENT_2).decode())
         else:
             print()
             term_width = shutil.get_terminal_size(fallback=(80, 24)).columns
@@ -119,33 +378,21 @@ def main(profiles, outfile, outputformat, dry_run, tformat, regions):
             return
 
     try:
-        with Path(outfile).open('w', encoding='utf-8') as f:
-            if outputformat == "CSV":
-                writer = csv.writer(f)
-                writer.writerow(["InstanceID", "Name", "Account", "Type", "State", "AZ", "PrivateIP", "PublicIP", "VPC", "Subnet", "ENIs", "Volumes"])
-                for instance in sorted(instances_found.values(), key=lambda x: (x["account"], x["az"], x["instance_id"])):
-                    writer.writerow([
-                        instance["instance_id"],
-                        instance["instance_name"],
-                        instance["account"],
-                        instance["type"],
-                        instance["state"],
-                        instance["az"],
-                        instance["privateipv4"],
-                        instance["publicipv4"],
-                        instance["vpc"],
-                        instance["subnet"],
-                        json.dumps(instance["enis"], separators=(",", ":"), default=str),
-                        json.dumps(instance["volumes"], separators=(", ", ":"), default=str)
-                    ])
-            else:
-                f.write(json.dumps(instances_found, indent=4))
+        with Path(outfile).open('wb') as f:
+            f.write(orjson.dumps(json_keyed(instances_found), default=str, option=orjson.OPT_INDENT_2))
     except Exception:
         logging.error(f"Failed to write {outfile}")
     else:
         logging.info(f"Wrote {len(instances_found)} instances to {outfile}")
 
 
+def region_name(s):
+    """argparse type for --regions - rejects regions outside VALID_REGIONS"""
+    if s not in VALID_REGIONS:
+        raise argparse.ArgumentTypeError(f"invalid region {s} (choose from {', '.join(sorted(VALID_REGIONS))})")
+    return s
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="List EC2 instances across AWS profiles.")
     parser.add_argument(
@@ -186,16 +433,34 @@ def parse_args():
     parser.add_argument(
         "--regions",
         nargs="+",
+        type=region_name,
         default=["us-east-1", "us-east-2", "us-west-2"],
         help="AWS regions to query (default: us-east-1 us-east-2 us-west-2)"
     )
+    parser.add_argument(
+        "--include-terminated",
+        action="store_true",
+        help="Also list terminated instances")
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Scan with aiobotocore on one event loop instead of a thread pool (requires aiobotocore)")
 
     return parser.parse_args()
 
 
+def fit_column(value, width, wrap):
+    """Wrap or truncate a value only when it is wider than its column"""
+    if len(value) <= width:
+        return value
+    if wrap:
+        return "\n".join(textwrap.wrap(value, width=width))
+    return value[:width - 3] + "..."
+
+
 def format_table_data(instances_found, max_width, wrap=False):
     headers = ["Name", "Instance ID", "Account", "AZ"]
-    data = []
 
     # Rough estimate of max width per column
     max_name = int(max_width * 0.5)
@@ -203,30 +468,15 @@ def format_table_data(instances_found, max_width, wrap=False):
     max_account = int(max_width * 0.3)
     max_region = int(max_width * 0.2)
 
-    for _, info in sorted(instances_found.items()):
-        name = info["instance_name"]
-        ident = info["instance_id"]
-        acct = info["account"]
-        az = info["az"]
-
-        if not wrap:
-            # Truncate values that are too long
-            if len(name) > max_name:
-                name = name[:max_name - 3] + "..."
-            if len(ident) > max_ident:
-                ident = ident[:max_ident - 3] + "..."
-            if len(acct) > max_account:
-                acct = acct[:max_account - 3] + "..."
-            if len(az) > max_region:
-                az = az[:max_region - 3] + "..."
-        else:
-            # Wrap long fields
-            name = "\n".join(textwrap.wrap(name, width=max_name))
-            ident = "\n".join(textwrap.wrap(ident, width=max_ident))
-            acct = "\n".join(textwrap.wrap(acct, width=max_account))
-            az = "\n".join(textwrap.wrap(az, width=max_region))
-
-        data.append([name, ident, acct, az])
+    data = [
+        [
+            fit_column(info.instance_name, max_name, wrap),
+            fit_column(info.instance_id, max_ident, wrap),
+            fit_column(info.account, max_account, wrap),
+            fit_column(info.az, max_region, wrap)
+        ]
+        for info in instances_found
+    ]
 
     return headers, data
 
@@ -235,18 +485,23 @@ def validate_output_path(path_str):
     """Validate the user-provided output path"""
     path = Path(path_str).expanduser()
 
-    # Check if it's a directory
-    if path.exists() and path.is_dir():
-        logging.error(f"Output path '{path}' is a directory, not a file.")
-        sys.exit(1)
+    # Check if it's a directory - one stat() covers exists and is_dir
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        pass
+    else:
+        if stat.S_ISDIR(mode):
+            logging.error(f"Output path '{path}' is a directory, not a file.")
+            sys.exit(1)
 
-    # Check if parent directory exists and is writable
+    # Check if parent directory exists and is writable - only stat it again to explain a failure
     parent = path.parent
-    if not parent.exists():
-        logging.error(f"Directory '{parent}' does not exist.")
-        sys.exit(1)
     if not os.access(parent, os.W_OK):
-        logging.error(f"Directory '{parent}' is not writable.")
+        if not parent.exists():
+            logging.error(f"Directory '{parent}' does not exist.")
+        else:
+            logging.error(f"Directory '{parent}' is not writable.")
         sys.exit(1)
 
     return path
@@ -257,9 +512,8 @@ if __name__ == "__main__":
 
     logging.basicConfig(level=getattr(logging, args.log_level.upper()))
 
-    invalid_regions = [r for r in args.regions if r not in VALID_REGIONS]
-    if invalid_regions:
-        logging.error(f"Invalid region(s) specified: {', '.join(invalid_regions)}")
+    if args.use_async and importlib.util.find_spec("aiobotocore") is None:
+        logging.error("--async requires the aiobotocore package")
         sys.exit(1)
 
     profiles = args.profile or []
@@ -267,4 +521,4 @@ if __name__ == "__main__":
     outfile = args.output or f"ec2_instances_{datetime.now().strftime('%Y%m%d-%H%M%S')}.{default_ext}"
     outfile = validate_output_path(outfile)
 
-    main(profiles, outfile, args.outputformat, args.dry_run, args.tableformat, args.regions)
+    main(profiles, outfile, args.outputformat, args.dry_run, args.tableformat, args.regions, args.include_terminated, args.use_async)
@@ -4,29 +4,46 @@
 
 import argparse
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import csv
+import functools
 import logging
 import os
 from pathlib import Path
+import stat
 import sys
+import threading
+
+
+BOTOCORE_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 10}
+)
 
 
 def validate_output_path(path_str):
     """Validate the user-provided output path"""
     path = Path(path_str).expanduser()
 
-    # Check if it's a directory
-    if path.exists() and path.is_dir():
-        logging.error(f"Output path '{path}' is a directory, not a file.")
-        sys.exit(1)
+    # Check if it's a directory - one stat() covers exists and is_dir
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        pass
+    else:
+        if stat.S_ISDIR(mode):
+            logging.error(f"Output path '{path}' is a directory, not a file.")
+            sys.exit(1)
 
-    # Check if parent directory exists and is writable
+    # Check if parent directory exists and is writable - only stat it again to explain a failure
     parent = path.parent
-    if not parent.exists():
-        logging.error(f"Directory '{parent}' does not exist.")
-        sys.exit(1)
     if not os.access(parent, os.W_OK):
-        logging.error(f"Directory '{parent}' is not writable.")
+        if not parent.exists():
+            logging.error(f"Directory '{parent}' does not exist.")
+        else:
+            logging.error(f"Directory '{parent}' is not writable.")
         sys.exit(1)
 
     return path
@@ -58,45 +75,97 @@ def parse_args():
     return parser.parse_args()
 
 
-def main(profiles, outfile):
+_session_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _session_for(profile):
+    """Build one boto3 Session per profile, shared by the scan threads"""
+    with _session_lock:
+        return boto3.Session(profile_name=profile)
+
+
+def _client_for(profile, service, region=None):
+    """Create a client from the shared session - Session.client() is not thread-safe"""
+    session = _session_for(profile)
+    with _session_lock:
+        return session.client(service, region_name=region, config=BOTOCORE_CONFIG)
+
+
+@functools.lru_cache(maxsize=None)
+def _account_for(profile):
+    """Look up the account number for a profile once"""
+    return _client_for(profile, 'sts').get_caller_identity().get('Account')
+
+
+def list_function_pages(lambda_client):
+    """Yield list_functions pages by following NextMarker by hand"""
+    response = lambda_client.list_functions(MaxItems=50)
+    while True:
+        yield response
+        if 'NextMarker' not in response:
+            break
+        response = lambda_client.list_functions(MaxItems=50, Marker=response['NextMarker'])
+
+
+def scan(profile, region, acct_num):
+    """List function runtimes for a single profile and region"""
     functions = []
 
-    if not profiles:
-        profiles = boto3.session.Session().available_profiles
+    logging.info(f"Processing profile {profile} in {region}")
+    try:
+        _session_for(profile)
+    except Exception:
+        logging.error(f"Failed to create session for profile {profile}")
+        return functions
 
-    for profile in profiles:
-        logging.info(f"Processing profile {profile}")
-        try:
-            session = boto3.Session(profile_name=profile)
-        except Exception:
-            logging.error(f"Failed to create session for profile {profile}")
-            continue
-        sts_client = session.client('sts')
+    try:
+        lambda_client = _client_for(profile, 'lambda', region)
 
-        try:
-            acct_num = sts_client.get_caller_identity().get('Account')
-        except Exception as e:
-            logging.error(f"Failed to get account ID for profile {profile}: {e}")
-            continue
+        for page in list_function_pages(lambda_client):
+            for function in page['Functions']:
+                try:
+                    functions.append([acct_num, function['FunctionName'], function['Runtime'], region])
+                except Exception:
+                    pass
+    except Exception as e:
+        logging.error(f"Failed to list functions in {region} for profile {profile}: {e}")
 
-        for region in ("us-east-1", "us-east-2", "us-west-2"):
-            lambda_client = session.client('lambda', region_name=region)
+    return functions
 
-            paginator = lambda_client.get_paginator('list_functions')
 
-            for page in paginator.paginate():
-                for function in page['Functions']:
-                    try:
-                        functions.append([acct_num, function['FunctionName'], function['Runtime'], region])
-                    except Exception:
-                        pass
+def main(profiles, outfile):
+    functions = []
 
-    if outfile == '':
-        print(f"{'Account':<13} {'Function Name':<42} {'Runtime':<15}")
-        print("-" * 70)
+    if not profiles:
+        profiles = boto3.session.Session().available_profiles
+
+    regions = ("us-east-1", "us-east-2", "us-west-2")
+
+    if profiles:
+        with ThreadPoolExecutor(max_workers=min(32, len(profiles) * len(regions))) as executor:
+            accounts = {}
+            lookups = {executor.submit(_account_for, p): p for p in profiles}
+            for future in as_completed(lookups):
+                profile = lookups[future]
+                try:
+                    accounts[profile] = future.result()
+                except Exception as e:
+                    logging.error(f"Failed to get account ID for profile {profile}: {e}")
+
+            tasks = [(p, r, accounts[p]) for p in profiles if p in accounts for r in regions]
+            futures = [executor.submit(scan, p, r, a) for p, r, a in tasks]
+            # Collect in submission order so rows stay grouped by profile, then region
+            for future in futures:
+                try:
+                    functions.extend(future.result())
+                except Exception as e:
+                    logging.error(e)
 
-        for f in functions:
-            print(f"{f[0]:<13} {f[1]:<42} {f[2]:<15}")
+    if outfile == '':
+        lines = [f"{'Account':<13} {'Function Name':<42} {'Runtime':<15}", "-" * 70]
+        lines.extend(f"{acct:<13} {name:<42} {runtime:<15}" for acct, name, runtime, _ in functions)
+        sys.stdout.write("\n".join(lines) + "\n")
     else:
         try:
             with Path(outfile).open('w') as f:
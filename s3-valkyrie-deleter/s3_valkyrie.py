@@ -10,69 +10,111 @@
 
 
 import boto3
+from botocore.config import Config
 # import colorama
 from colorama import Fore, Style
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ThreadPoolExecutor, wait
 import logging
 
 
 DRY_RUN = True
 S3_BUCKETS = [('bucketname', 'prefix_or_blank')]
+BATCH_SIZE = 1000  # delete_objects limit per request
+MAX_WORKERS = 16
+
+BOTOCORE_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 10}
+)
 
 logging.basicConfig(level=logging.INFO)
 
 
+def delete_batch(client, bucket, objects):
+    """Delete up to BATCH_SIZE versions in one request - returns the number deleted"""
+    try:
+        response = client.delete_objects(Bucket=bucket, Delete={'Objects': objects, 'Quiet': True})
+    except Exception as e:
+        logging.error(f"Well, tried to delete {len(objects)} versions from {bucket}: {e}")
+        return 0
+
+    errors = response.get('Errors', [])
+    for err in errors:
+        logging.error(f"Well, tried to delete {bucket}: {err.get('Key')}: {err.get('VersionId')}: {err.get('Message')}")
+
+    logging.info(f"Deleted {len(objects) - len(errors)} of {len(objects)} versions from {bucket}")
+    return len(objects) - len(errors)
+
+
+def collect(pending, deleted, return_when):
+    """Wait on in-flight batches and tally the ones that finished"""
+    done, _ = wait(pending, return_when=return_when)
+    for future in done:
+        deleted[pending.pop(future)] += future.result()
+
+
 def main():
     """Find objects and delete them - does not override object lock"""
 
     deleted = {'objects': 0, 'markers': 0}
 
     session = boto3.Session(profile_name='pigs')
-    client = session.client('s3')
+    client = session.client('s3', config=BOTOCORE_CONFIG)
 
-    for bucket, prefix in S3_BUCKETS:
-        paginator = client.get_paginator('list_object_versions')
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for bucket, prefix in S3_BUCKETS:
+            paginator = client.get_paginator('list_object_versions')
 
-        operation_parameters = {'Bucket': bucket, 'Prefix': prefix}
+            operation_parameters = {'Bucket': bucket, 'Prefix': prefix}
 
-        try:
-            page_iterator = paginator.paginate(**operation_parameters)
-        except Exception as e:
-            logging.error(f"Well, that failed: {e}")
-        else:
             try:
-                for page in page_iterator:
-                    for k in page.get('Versions', []):
-                        if DRY_RUN:
-                            logging.info(f"DRY_RUN: Would have deleted {bucket}: {k['Key']}: {k['VersionId']}")
-                        else:
-                            try:
-                                client.delete_object(Bucket=bucket, Key=k['Key'], VersionId=k['VersionId'])
-                            except Exception as e:
-                                logging.error(f"Well, tried to delete {bucket}: {k['Key']}: {k['VersionId']}: {e}")
+                page_iterator = paginator.paginate(**operation_parameters)
+            except Exception as e:
+                logging.error(f"Well, that failed: {e}")
+            else:
+                try:
+                    for page in page_iterator:
+                        versions = []
+                        for k in page.get('Versions', []):
+                            if DRY_RUN:
+                                logging.info(f"DRY_RUN: Would have deleted {bucket}: {k['Key']}: {k['VersionId']}")
                             else:
-                                deleted['objects'] += 1
-                                logging.info(f"Deleted {bucket}: {k['Key']}: {k['VersionId']}")
-
-                    for marker in page.get('DeleteMarkers', []):
-                        key = marker.get('Key')
-                        version_id = marker.get('VersionId')
-
-                        if DRY_RUN:
-                            logging.info(f"DRY_RUN: Would have removed delete marker {bucket}: {key}: {version_id}")
-                        else:
-                            try:
-                                client.delete_object(Bucket=bucket, Key=key, VersionId=version_id)
-                            except Exception as e:
-                                logging.error(f"Error deleting delete marker {bucket}: {key}: {version_id}: {e}")
+                                versions.append({'Key': k['Key'], 'VersionId': k['VersionId']})
+                                if len(versions) == BATCH_SIZE:
+                                    pending[executor.submit(delete_batch, client, bucket, versions)] = 'objects'
+                                    versions = []
+                        if versions:
+                            pending[executor.submit(delete_batch, client, bucket, versions)] = 'objects'
+
+                        markers = []
+                        for marker in page.get('DeleteMarkers', []):
+                            key = marker.get('Key')
+                            version_id = marker.get('VersionId')
+
+                            if DRY_RUN:
+                                logging.info(f"DRY_RUN: Would have removed delete marker {bucket}: {key}: {version_id}")
                             else:
-                                deleted['markers'] += 1
-                                logging.info(f"Removed marker {bucket}: {key}: {version_id}")
+                                markers.append({'Key': key, 'VersionId': version_id})
+                                if len(markers) == BATCH_SIZE:
+                                    pending[executor.submit(delete_batch, client, bucket, markers)] = 'markers'
+                                    markers = []
+                        if markers:
+                            pending[executor.submit(delete_batch, client, bucket, markers)] = 'markers'
 
-                    if not page.get('Versions') and not page.get('DeleteMarkers'):
-                        logging.info(f"No deletable objects found in {bucket}/{prefix}")
+                        if not page.get('Versions') and not page.get('DeleteMarkers'):
+                            logging.info(f"No deletable objects found in {bucket}/{prefix}")
 
-            except Exception as e:
-                logging.error(f"Well, that's busted: {e}")
+                        # Hold off paging while too many batches are in flight
+                        if len(pending) >= MAX_WORKERS * 2:
+                            collect(pending, deleted, FIRST_COMPLETED)
+
+                except Exception as e:
+                    logging.error(f"Well, that's busted: {e}")
+
+        collect(pending, deleted, ALL_COMPLETED)
 
     logging.info(f"\n\nDeleted {deleted['objects']} objects and removed {deleted['markers']} delete markers.\n")
 
@@ -4,18 +4,54 @@
 
 import argparse
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 import csv
 from datetime import datetime
+import functools
 import json
 import logging
 import os
 from pathlib import Path
 import shutil
+import stat
 import sys
 from tabulate import tabulate
 import textwrap
 
 
+BOTOCORE_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 10}
+)
+
+
+def list_all_buckets(s3_client):
+    """List every bucket, paginating where the SDK supports it"""
+    if not s3_client.can_paginate('list_buckets'):
+        return s3_client.list_buckets()['Buckets']
+
+    # BucketRegion is only returned when the request carries a parameter, so always send MaxBuckets
+    paginator = s3_client.get_paginator('list_buckets')
+    pages = paginator.paginate(PaginationConfig={'PageSize': 10000})
+    return [bucket for page in pages for bucket in page['Buckets']]
+
+
+def resolve_region(s3_client, bucket_name):
+    """Return a bucket's region from the HeadBucket response headers"""
+    try:
+        response = s3_client.head_bucket(Bucket=bucket_name)
+    except ClientError as e:
+        # A 403 still carries the region header
+        response = e.response
+    except Exception:
+        return ""
+
+    return response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('x-amz-bucket-region', "")
+
+
 def main(profiles, outfile, outputformat, dry_run, tformat):
     """List buckets in profiles"""
     buckets_found = {}
@@ -30,8 +66,8 @@ def main(profiles, outfile, outputformat, dry_run, tformat):
         except Exception:
             logging.error(f"Failed to create session for profile {profile}")
             continue
-        sts_client = session.client('sts')
-        s3_client = session.client('s3')
+        sts_client = session.client('sts', config=BOTOCORE_CONFIG)
+        s3_client = session.client('s3', config=BOTOCORE_CONFIG)
 
         try:
             acct_num = sts_client.get_caller_identity().get('Account')
@@ -40,22 +76,21 @@ def main(profiles, outfile, outputformat, dry_run, tformat):
             continue
 
         try:
-            response = s3_client.list_buckets()
+            buckets = list_all_buckets(s3_client)
         except Exception as e:
             logging.error(e)
         else:
-            for bucket in response['Buckets']:
-                try:
-                    loc_response = s3_client.get_bucket_location(Bucket=bucket['Name'])
-                    location = loc_response.get('LocationConstraint')
-                except Exception:
-                    location = ""
-                else:
-                    if not location:
-                        location = 'us-east-1'
+            # SDKs that can't paginate ListBuckets don't return BucketRegion, so fall back to HeadBucket
+            missing = [bucket['Name'] for bucket in buckets if not bucket.get('BucketRegion')]
+            locations = {}
+            if missing:
+                with ThreadPoolExecutor(max_workers=32) as executor:
+                    locations = dict(zip(missing, executor.map(functools.partial(resolve_region, s3_client), missing)))
+
+            for bucket in buckets:
                 buckets_found[bucket['Name']] = {
                     "account_id": acct_num,
-                    "region": location
+                    "region": bucket.get('BucketRegion') or locations[bucket['Name']]
                 }
 
     if not buckets_found:
@@ -78,12 +113,10 @@ def main(profiles, outfile, outputformat, dry_run, tformat):
             if outputformat == "CSV":
                 writer = csv.writer(f)
                 writer.writerow(["BucketName", "AccountId", "Region"])
-                for bucket in sorted(buckets_found):
-                    writer.writerow([
-                        bucket,
-                        buckets_found[bucket]["account_id"],
-                        buckets_found[bucket]["region"]
-                    ])
+                writer.writerows(
+                    [bucket, info["account_id"], info["region"]]
+                    for bucket, info in sorted(buckets_found.items())
+                )
             else:
                 f.write(json.dumps(buckets_found, indent=4))
     except Exception:
@@ -133,35 +166,31 @@ def parse_args():
     return parser.parse_args()
 
 
+def fit_column(value, width, wrap):
+    """Wrap or truncate a value only when it is wider than its column"""
+    if len(value) <= width:
+        return value
+    if wrap:
+        return "\n".join(textwrap.wrap(value, width=width))
+    return value[:width - 3] + "..."
+
+
 def format_table_data(buckets_found, max_width, wrap=False):
     headers = ["Bucket Name", "Account ID", "Region"]
-    data = []
 
     # Rough estimate of max width per column
     max_bucket = int(max_width * 0.5)
     max_account = int(max_width * 0.3)
     max_region = int(max_width * 0.2)
 
-    for name, info in sorted(buckets_found.items()):
-        bn = name
-        acct = info["account_id"]
-        region = info["region"]
-
-        if not wrap:
-            # Truncate values that are too long
-            if len(bn) > max_bucket:
-                bn = bn[:max_bucket - 3] + "..."
-            if len(acct) > max_account:
-                acct = acct[:max_account - 3] + "..."
-            if len(region) > max_region:
-                region = region[:max_region - 3] + "..."
-        else:
-            # Wrap long fields
-            bn = "\n".join(textwrap.wrap(bn, width=max_bucket))
-            acct = "\n".join(textwrap.wrap(acct, width=max_account))
-            region = "\n".join(textwrap.wrap(region, width=max_region))
-
-        data.append([bn, acct, region])
+    data = [
+        [
+            fit_column(name, max_bucket, wrap),
+            fit_column(info["account_id"], max_account, wrap),
+            fit_column(info["region"], max_region, wrap)
+        ]
+        for name, info in sorted(buckets_found.items())
+    ]
 
     return headers, data
 
@@ -170,18 +199,23 @@ def validate_output_path(path_str):
     """Validate the user-provided output path"""
     path = Path(path_str).expanduser()
 
-    # Check if it's a directory
-    if path.exists() and path.is_dir():
-        logging.error(f"Output path '{path}' is a directory, not a file.")
-        sys.exit(1)
+    # Check if it's a directory - one stat() covers exists and is_dir
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        pass
+    else:
+        if stat.S_ISDIR(mode):
+            logging.error(f"Output path '{path}' is a directory, not a file.")
+            sys.exit(1)
 
-    # Check if parent directory exists and is writable
+    # Check if parent directory exists and is writable - only stat it again to explain a failure
     parent = path.parent
-    if not parent.exists():
-        logging.error(f"Directory '{parent}' does not exist.")
-        sys.exit(1)
     if not os.access(parent, os.W_OK):
-        logging.error(f"Directory '{parent}' is not writable.")
+        if not parent.exists():
+            logging.error(f"Directory '{parent}' does not exist.")
+        else:
+            logging.error(f"Directory '{parent}' is not writable.")
         sys.exit(1)
 
     return path
@@ -4,13 +4,65 @@
 
 import argparse
 import boto3
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
 import logging
-import sys
+import threading
 
 
 VALID_REGIONS = {"us-east-1", "us-east-2", "us-west-1", "us-west-2",
                  "ca-central-1", "eu-west-1", "eu-west-2", "eu-central-1"}
 
+BOTOCORE_CONFIG = Config(
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 10}
+)
+
+
+_session_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _session_for(profile):
+    """Build one boto3 Session per profile, shared by the scan threads"""
+    with _session_lock:
+        return boto3.Session(profile_name=profile)
+
+
+def _client_for(profile, service, region=None):
+    """Create a client from the shared session - Session.client() is not thread-safe"""
+    session = _session_for(profile)
+    with _session_lock:
+        return session.client(service, region_name=region, config=BOTOCORE_CONFIG)
+
+
+def scan(profile, region):
+    """Disable public sharing of SSM documents for a single profile and region"""
+    logging.info(f"Processing profile {profile} in {region}")
+    try:
+        _session_for(profile)
+    except Exception as e:
+        logging.error(f"Failed to create session for profile {profile}: {e}")
+        return
+
+    try:
+        ssm_client = _client_for(profile, 'ssm', region)
+    except Exception as e:
+        logging.error(f"Cannot set session in {region}: {e}")
+        return
+
+    try:
+        ssm_client.update_service_setting(
+            SettingId='/ssm/documents/console/public-sharing-permission',
+            SettingValue='Disable'
+        )
+    except Exception as e:
+        logging.error(f"Cannot set permission in {region}: {e}")
+    else:
+        logging.info(f"Set permission to disabled in {region} for profile {profile}")
+
 
 def main(profiles, regions):
     """Disable public sharing of SSM documents"""
@@ -20,31 +72,23 @@ def main(profiles, regions):
     if not profiles:
         profiles = boto3.session.Session().available_profiles
 
-    for profile in profiles:
-        logging.info(f"Processing profile {profile}")
-        try:
-            session = boto3.Session(profile_name=profile)
-        except Exception as e:
-            logging.error(f"Failed to create session for profile {profile}: {e}")
-            continue
-
-        for region in regions:
-            try:
-                ssm_client = session.client('ssm', region_name=region)
-            except Exception as e:
-                logging.error(f"Cannot set session in {region}: {e}")
-                continue
-
-            try:
-                ssm_client.update_service_setting(
-                    SettingId='/ssm/documents/console/public-sharing-permission',
-                    SettingValue='Disable'
-                )
-            except Exception as e:
-                logging.error(f"Cannot set permission in {region}: {e}")
-                continue
-            else:
-                logging.info(f"Set permission to disabled in {region}")
+    tasks = [(p, r) for p in profiles for r in regions]
+
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(32, len(tasks))) as executor:
+            futures = [executor.submit(scan, p, r) for p, r in tasks]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.exception(e)
+
+
+def region_name(s):
+    """argparse type for --regions - rejects regions outside VALID_REGIONS"""
+    if s not in VALID_REGIONS:
+        raise argparse.ArgumentTypeError(f"invalid region {s} (choose from {', '.join(sorted(VALID_REGIONS))})")
+    return s
 
 
 def parse_args():
@@ -67,6 +111,7 @@ def parse_args():
     parser.add_argument(
         "--regions",
         nargs="+",
+        type=region_name,
         default=["us-east-1", "us-east-2", "us-west-2"],
         help="AWS regions to query (default: us-east-1 us-east-2 us-west-2)"
     )
@@ -79,11 +124,6 @@ if __name__ == "__main__":
 
     logging.basicConfig(level=getattr(logging, args.log_level.upper()))
 
-    invalid_regions = [r for r in args.regions if r not in VALID_REGIONS]
-    if invalid_regions:
-        logging.error(f"Invalid region(s) specified: {', '.join(invalid_regions)}")
-        sys.exit(1)
-
     profiles = args.profile or []
 
     main(profiles, args.regions)
@@ -4,103 +4,181 @@
 
 import argparse
 import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError, ProfileNotFound
+from concurrent.futures import ThreadPoolExecutor
 import csv
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
+import functools
 import json
 import logging
 import os
 from pathlib import Path
 import shutil
+import stat
 import sys
 from tabulate import tabulate
 import textwrap
+import threading
 
 
-def main(profiles, outfile, outputformat, dry_run, tformat):
+VALID_REGIONS = {"us-east-1", "us-east-2", "us-west-1", "us-west-2",
+                 "ca-central-1", "eu-west-1", "eu-west-2", "eu-central-1"}
+
+BOTOCORE_CONFIG = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={"mode": "adaptive", "max_attempts": 10}
+)
+
+# Above this many rows the dry-run table skips tabulate
+TABULATE_ROW_LIMIT = 1000
+
+_client_lock = threading.Lock()
+
+
+@dataclass(slots=True)
+class VPC:
+    """One VPC, keyed by its VPC ID in vpcs_found"""
+    account_id: str
+    region: str
+    cidr: str
+    cidr6: str = ""
+    cidrassociations: dict = field(default_factory=dict)
+
+
+@functools.lru_cache(maxsize=None)
+def _session(profile):
+    """Build one boto3 Session per profile"""
+    with _client_lock:
+        return boto3.Session(profile_name=profile)
+
+
+@functools.lru_cache(maxsize=None)
+def _client(profile, service, region=None):
+    """Build one client per profile, service and region - Session.client() is not thread-safe"""
+    session = _session(profile)
+    with _client_lock:
+        return session.client(service, region_name=region, config=BOTOCORE_CONFIG)
+
+
+def _scan(profile, region, acct_num):
+    """List VPCs for one profile and region as (vpc_id, VPC) tuples"""
+    vpcs = []
+
+    try:
+        vpc_client = _client(profile, 'ec2', region)
+        paginator = vpc_client.get_paginator('describe_vpcs')
+        for page in paginator.paginate(PaginationConfig={'PageSize': 1000}):
+            for vpc in page['Vpcs']:
+                info = VPC(
+                    account_id=acct_num,
+                    region=region,
+                    cidr=vpc['CidrBlock'],
+                    cidrassociations={a['AssociationId']: a['CidrBlock'] for a in vpc['CidrBlockAssociationSet']}
+                )
+                ipv6_set = vpc.get('Ipv6CidrBlockAssociationSet')
+                if ipv6_set:
+                    info.cidr6 = ipv6_set[0].get('Ipv6CidrBlock')
+
+                vpcs.append((vpc['VpcId'], info))
+    except (ClientError, BotoCoreError) as e:
+        # Throttling is retried by the adaptive retry config before it gets here
+        logging.error(f"Failed to describe VPCs in region {region} for profile {profile}: {e}")
+
+    return vpcs
+
+
+def main(profiles, outfile, outputformat, dry_run, tformat, regions, sort=None):
     """List VPCs in given profiles and regions"""
     vpcs_found = {}
 
+    logging.info(f"Checking regions {regions}")
+
     if not profiles:
         profiles = boto3.session.Session().available_profiles
 
+    tasks = []
     for profile in profiles:
         logging.info(f"Processing profile {profile}")
         try:
-            session = boto3.Session(profile_name=profile)
-        except Exception:
-            logging.error(f"Failed to create session for profile {profile}")
+            acct_num = _client(profile, 'sts').get_caller_identity().get('Account')
+        except ProfileNotFound as e:
+            logging.error(f"Failed to create session for profile {profile}: {e}")
+            continue
+        except (ClientError, BotoCoreError) as e:
+            # Credentials, endpoint and timeout errors happen in the call, not the session
+            logging.error(f"Failed to get account ID for profile {profile}: {e}")
             continue
-        sts_client = session.client('sts')
-
-        for region in ("us-east-1", "us-east-2", "us-west-2", "ca-central-1"):
-            vpc_client = session.client('ec2', region_name=region)
 
-            try:
-                acct_num = sts_client.get_caller_identity().get('Account')
-            except Exception as e:
-                logging.error(f"Failed to get account ID for profile {profile}: {e}")
-                continue
+        tasks.extend((profile, region, acct_num) for region in regions)
 
-            try:
-                response = vpc_client.describe_vpcs()
-            except Exception as e:
-                logging.error(f"Failed to describe VPCs in region {region} for profile {profile}: {e}")
-            else:
-                for vpc in response['Vpcs']:
-                    vpcs_found[vpc['VpcId']] = {
-                        "account_id": acct_num,
-                        "region": region,
-                        "cidr": vpc['CidrBlock'],
-                        "cidr6": "",
-                        "cidrassociations": {}
-                    }
-                    if 'Ipv6CidrBlockAssociationSet' in vpc.keys():
-                        # vpcs_found[vpc['VpcId']] |= {"cidr6": vpc['Ipv6CidrBlockAssociationSet'][0]['Ipv6CidrBlock']}
-                        ipv6_set = vpc.get('Ipv6CidrBlockAssociationSet')
-                        if ipv6_set and len(ipv6_set) > 0:
-                            vpcs_found[vpc['VpcId']]["cidr6"] = ipv6_set[0].get('Ipv6CidrBlock')
-
-                    tempcidr = {}
-                    for foo in vpc['CidrBlockAssociationSet']:
-                        tempcidr |= {foo['AssociationId']: foo['CidrBlock']}
-                        vpcs_found[vpc['VpcId']]['cidrassociations'] |= tempcidr
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(32, len(profiles) * len(regions))) as executor:
+            futures = [executor.submit(_scan, *task) for task in tasks]
+            # Merge in submission order so unsorted output stays grouped by profile, then region
+            for future in futures:
+                try:
+                    vpcs_found.update(future.result())
+                except Exception as e:
+                    logging.error(e)
 
     if not vpcs_found:
         logging.warning("No VPCs found across selected profiles.")
         return
 
+    # Sort CSV/table output by default but leave JSON in scan order unless asked
+    if sort is None:
+        sort = outputformat == "CSV"
+
+    # Sorted once and shared by every output path
+    items = sorted(vpcs_found.items()) if sort else vpcs_found.items()
+    if sort and outputformat == "JSON":
+        vpcs_found = dict(items)
+
     if dry_run:
         if outputformat == "JSON":
             print()
-            print(json.dumps(vpcs_found, indent=4))
+            json.dump(vpcs_found, sys.stdout, indent=4, default=asdict)
+            print()
         else:
             print()
             term_width = shutil.get_terminal_size(fallback=(80, 24)).columns
-            headers, data = format_table_data(vpcs_found, term_width, wrap=True)
-            print(tabulate(data, headers=headers, tablefmt=tformat))
+            if len(vpcs_found) > TABULATE_ROW_LIMIT:
+                # tabulate measures every row before printing - stream fixed-width lines instead
+                logging.info(f"More than {TABULATE_ROW_LIMIT} VPCs, printing a plain table")
+                headers, data = format_table_data(items, term_width, wrap=False)
+                sys.stdout.write("\n".join(format_plain_lines(headers, data)) + "\n")
+            else:
+                headers, data = format_table_data(items, term_width, wrap=True)
+                print(tabulate(data, headers=headers, tablefmt=tformat))
             return
 
     try:
-        with Path(outfile).open('w') as f:
+        with Path(outfile).open('w', newline='', buffering=1024 * 1024) as f:
             if outputformat == "CSV":
-                writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+                writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
                 writer.writerow(["VpcId", "AccountId", "Region", "CIDR", "CIDR6"])
-                for vpc in sorted(vpcs_found):
-                    writer.writerow([
-                        vpc,
-                        vpcs_found[vpc]["account_id"],
-                        vpcs_found[vpc]["region"],
-                        vpcs_found[vpc]["cidr"],
-                        vpcs_found[vpc]["cidr6"]
-                    ])
+                writer.writerows(
+                    [vpc_id, info.account_id, info.region, info.cidr, info.cidr6]
+                    for vpc_id, info in items
+                )
             else:
-                f.write(json.dumps(vpcs_found, indent=4))
+                json.dump(vpcs_found, f, indent=4, default=asdict)
     except Exception:
         logging.error(f"Failed to write {outfile}")
     else:
         logging.info(f"Wrote {len(vpcs_found)} VPCs to {outfile}")
 
 
+def region_name(s):
+    """argparse type for --regions - rejects regions outside VALID_REGIONS"""
+    if s not in VALID_REGIONS:
+        raise argparse.ArgumentTypeError(f"invalid region {s} (choose from {', '.join(sorted(VALID_REGIONS))})")
+    return s
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description="List VPCs across AWS profiles.")
     parser.add_argument(
@@ -138,11 +216,24 @@ def parse_args():
         default="plain",
         choices=["plain", "pipe", "github", "grid", "fancy_grid"],
         help="Choose dry run output format (default: plain)")
+    parser.add_argument(
+        "--regions",
+        nargs="+",
+        type=region_name,
+        default=["us-east-1", "us-east-2", "us-west-2", "ca-central-1"],
+        help="AWS regions to query (default: us-east-1 us-east-2 us-west-2 ca-central-1)"
+    )
+    parser.add_argument(
+        "--sort",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Sort output by VPC ID (default: sort CSV and tables, not JSON)"
+    )
 
     return parser.parse_args()
 
 
-def format_table_data(vpcs_found, max_width, wrap=False):
+def format_table_data(items, max_width, wrap=False):
     headers = ["VPC ID", "Account ID", "Region", "CIDR"]
     data = []
 
@@ -152,11 +243,17 @@ def format_table_data(vpcs_found, max_width, wrap=False):
     max_region = int(max_width * 0.2)
     max_cidr = int(max_width * 0.2)
 
-    for name, info in sorted(vpcs_found.items()):
+    # One wrapper per column instead of a new TextWrapper per textwrap.wrap() call
+    wrap_bucket = textwrap.TextWrapper(width=max_bucket)
+    wrap_account = textwrap.TextWrapper(width=max_account)
+    wrap_region = textwrap.TextWrapper(width=max_region)
+    wrap_cidr = textwrap.TextWrapper(width=max_cidr)
+
+    for name, info in items:
         bn = name
-        acct = info["account_id"]
-        region = info["region"]
-        cidr = info["cidr"]
+        acct = info.account_id
+        region = info.region
+        cidr = info.cidr
 
         if not wrap:
             # Truncate values that are too long
@@ -170,32 +267,48 @@ def format_table_data(vpcs_found, max_width, wrap=False):
                 cidr = cidr[:max_cidr - 3] + "..."
         else:
             # Wrap long fields
-            bn = "\n".join(textwrap.wrap(bn, width=max_bucket))
-            acct = "\n".join(textwrap.wrap(acct, width=max_account))
-            region = "\n".join(textwrap.wrap(region, width=max_region))
-            cidr = "\n".join(textwrap.wrap(cidr, width=max_cidr))
+            bn = "\n".join(wrap_bucket.wrap(bn))
+            acct = "\n".join(wrap_account.wrap(acct))
+            region = "\n".join(wrap_region.wrap(region))
+            cidr = "\n".join(wrap_cidr.wrap(cidr))
 
         data.append([bn, acct, region, cidr])
 
     return headers, data
 
 
+def format_plain_lines(headers, data):
+    """Yield fixed-width table lines without going through tabulate"""
+    widths = [max(len(header), *(len(row[i]) for row in data)) for i, header in enumerate(headers)]
+    line = "  ".join(f"{{:<{width}}}" for width in widths)
+
+    yield line.format(*headers).rstrip()
+    yield "  ".join("-" * width for width in widths)
+    for row in data:
+        yield line.format(*row).rstrip()
+
+
 def validate_output_path(path_str):
     """Validate the user-provided output path"""
     path = Path(path_str).expanduser()
 
-    # Check if it's a directory
-    if path.exists() and path.is_dir():
-        logging.error(f"Output path '{path}' is a directory, not a file.")
-        sys.exit(1)
+    # Check if it's a directory - one stat() covers exists and is_dir
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        pass
+    else:
+        if stat.S_ISDIR(mode):
+            logging.error(f"Output path '{path}' is a directory, not a file.")
+            sys.exit(1)
 
-    # Check if parent directory exists and is writable
+    # Check if parent directory exists and is writable - only stat it again to explain a failure
     parent = path.parent
-    if not parent.exists():
-        logging.error(f"Directory '{parent}' does not exist.")
-        sys.exit(1)
     if not os.access(parent, os.W_OK):
-        logging.error(f"Directory '{parent}' is not writable.")
+        if not parent.exists():
+            logging.error(f"Directory '{parent}' does not exist.")
+        else:
+            logging.error(f"Directory '{parent}' is not writable.")
         sys.exit(1)
 
     return path
@@ -211,4 +324,4 @@ if __name__ == "__main__":
     outfile = args.output or f"vpc_list_{datetime.now().strftime('%Y%m%d-%H%M%S')}.{default_ext}"
     outfile = validate_output_path(outfile)
 
-    main(profiles, outfile, args.outputformat, args.dry_run, args.tableformat)
+    main(profiles, outfile, args.outputformat, args.dry_run, args.tableformat, args.regions, args.sort)